@@ -5,6 +5,7 @@ import logging
 from typing import Any, Optional, Dict
 from datetime import datetime, timedelta
 import shutil
+from operator import itemgetter
 
 logger = logging.getLogger(__name__)
 
@@ -123,7 +124,7 @@ class CacheManager:
                     cache_files.append((file_path, mtime))
             
             # Сортируем по времени изменения (старые сначала)
-            cache_files.sort(key=lambda x: x[1])
+            cache_files.sort(key=itemgetter(1))
             
             # Удаляем самые старые файлы
             for file_path, _ in cache_files[:count]:
@@ -34,6 +34,9 @@ class Config:
     # Настройки плагинов
     PLUGINS_ENABLED = os.getenv('PLUGINS_ENABLED', 'true').lower() == 'true'
     
+    # Раздача статики веб-панели из web/static (в проде обычно отдается nginx)
+    ADMIN_ENABLE_STATIC = os.getenv('ADMIN_ENABLE_STATIC', 'false').lower() == 'true'
+    
     # Поддерживаемые языки
     SUPPORTED_LANGUAGES = ['ru', 'en']
     DEFAULT_LANGUAGE = 'ru'
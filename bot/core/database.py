@@ -5,6 +5,13 @@ import os
 
 logger = logging.getLogger(__name__)
 
+# Допустимые варианты сортировки списка пользователей (ORDER BY нельзя передать параметром)
+USER_SORT_ORDERS = {
+    "last_active": "last_active DESC",
+    "total_requests": "total_requests DESC, last_active DESC",
+    "registration_date": "registration_date DESC",
+}
+
 class Database:
     """Класс для работы с базой данных"""
     
@@ -43,6 +50,8 @@ class Database:
                     total_duration INTEGER DEFAULT 0
                 )
             ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_last_active ON users (last_active DESC)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_total_requests ON users (total_requests DESC)')
             
             # Таблица запросов
             cursor.execute('''
@@ -204,6 +213,25 @@ class Database:
             logger.error(f"❌ Ошибка получения глобальной статистики: {e}")
             return 0, 0, 0, 0
     
+    def get_global_stats_combined(self):
+        """Возвращает глобальную статистику и рейтинг одним запросом"""
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                '''SELECT (SELECT COUNT(*) FROM users),
+                          COUNT(*),
+                          COALESCE(SUM(file_size), 0),
+                          COALESCE(SUM(duration), 0),
+                          (SELECT AVG(rating) FROM feedback),
+                          (SELECT COUNT(*) FROM feedback)
+                   FROM audio_requests'''
+            )
+            total_users, total_requests, total_size, total_duration, avg_rating, total_ratings = cursor.fetchone()
+            return total_users, total_requests, total_size, total_duration, avg_rating or 0, total_ratings
+        except Exception as e:
+            logger.error(f"❌ Ошибка получения глобальной статистики: {e}")
+            return 0, 0, 0, 0, 0, 0
+    
     def get_all_users(self):
         """Возвращает список всех пользователей"""
         try:
@@ -217,6 +245,35 @@ class Database:
             logger.error(f"❌ Ошибка получения списка пользователей: {e}")
             return []
     
+    def get_users_page(self, sort_col='last_active', limit=50, offset=0):
+        """Возвращает страницу пользователей, отсортированную на стороне БД (пустые имена - 'N/A')"""
+        try:
+            order_by = USER_SORT_ORDERS[sort_col]
+            cursor = self.connection.cursor()
+            cursor.execute(
+                f'''SELECT user_id,
+                          COALESCE(NULLIF(username, ''), 'N/A') AS username,
+                          COALESCE(NULLIF(first_name, ''), 'N/A') AS first_name,
+                          COALESCE(NULLIF(last_name, ''), 'N/A') AS last_name,
+                          total_requests, last_active 
+                   FROM users ORDER BY {order_by} LIMIT ? OFFSET ?''',
+                (limit, offset)
+            )
+            return cursor.fetchall()
+        except Exception as e:
+            logger.error(f"❌ Ошибка получения страницы пользователей: {e}")
+            return []
+    
+    def count_users(self):
+        """Возвращает количество пользователей"""
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute('SELECT COUNT(*) FROM users')
+            return cursor.fetchone()[0]
+        except Exception as e:
+            logger.error(f"❌ Ошибка подсчета пользователей: {e}")
+            return 0
+    
     def add_feedback(self, request_id, rating, comment=None):
         """Добавляет обратную связь"""
         try:
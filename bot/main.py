@@ -4,7 +4,7 @@ import asyncio
 import traceback
 import psutil
 import gc
-import torch
+import sys
 from datetime import datetime
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
@@ -53,6 +53,14 @@ def log_error(error_type, error, update=None):
     logger.error(f"   Traceback: {traceback.format_exc()}")
     return error_msg
 
+# Освобождение памяти после обработки
+def free_memory():
+    """Освобождает память; torch не импортируется, если он еще не загружен"""
+    torch = sys.modules.get('torch')
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    gc.collect()
+
 # Проверка прав администратора
 def is_admin(user_id):
     """Проверяет, является ли пользователь администратором"""
@@ -442,7 +450,7 @@ async def process_media(update: Update, context: ContextTypes.DEFAULT_TYPE, medi
             await processing_msg.edit_text("❌ Ошибка при обработке медиафайла")
             return
 
-        recognized_text = recognizer.recognize_audio(temp_audio_path, user_language)
+        recognized_text = await recognizer.recognize_audio_async(temp_audio_path, user_language)
 
         if recognized_text and "Ошибка" not in recognized_text:
             try:
@@ -486,8 +494,7 @@ async def process_media(update: Update, context: ContextTypes.DEFAULT_TYPE, medi
         except:
             pass
 
-        torch.cuda.empty_cache() if torch.cuda.is_available() else None
-        gc.collect()
+        free_memory()
 
 # ОБРАБОТЧИК АДМИН-МЕНЮ
 async def handle_admin_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -522,20 +529,21 @@ async def handle_admin_message(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.message.reply_text(stats_text, parse_mode='Markdown')
         
     elif text == "👥 Пользователи":
-        users = db.get_all_users()
+        users = db.get_users_page('last_active', 10, 0)
         if not users:
             await update.message.reply_text("📝 Пользователей пока нет.")
             return
+        total_users = db.count_users()
         
         users_text = "👥 *Список пользователей:*\n\n"
-        for i, user in enumerate(users[:10], 1):
+        for i, user in enumerate(users, 1):
             user_id, username, first_name, last_name, requests, last_active = user
             users_text += f"{i}. {first_name} {last_name} (@{username})\n"
             users_text += f"   ID: {user_id}, Запросов: {requests}\n"
             users_text += f"   Активность: {last_active}\n\n"
         
-        if len(users) > 10:
-            users_text += f"... и еще {len(users) - 10} пользователей"
+        if total_users > 10:
+            users_text += f"... и еще {total_users - 10} пользователей"
         
         await update.message.reply_text(users_text, parse_mode='Markdown')
         
@@ -806,8 +814,7 @@ async def handle_audio(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except:
             pass
         
-        torch.cuda.empty_cache() if torch.cuda.is_available() else None
-        gc.collect()
+        free_memory()
 
 # ОБРАБОТЧИК ОБРАТНОЙ СВЯЗИ
 async def handle_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -7,6 +7,32 @@ import string
 
 logger = logging.getLogger(__name__)
 
+_RU_LOWER_RE = re.compile(r'[а-яё]')
+_EN_LOWER_RE = re.compile(r'[a-z]')
+
+def _detect_language(text: str) -> str:
+    """Определяет язык текста (общий для всех плагинов)"""
+    # Считаем по text.lower(), а не через IGNORECASE: у некоторых символов
+    # ('ſ', знак Кельвина) правила регистра у re и lower() расходятся
+    text = text.lower()
+    ru_chars = len(_RU_LOWER_RE.findall(text))
+    en_chars = len(_EN_LOWER_RE.findall(text))
+    return 'ru' if ru_chars > en_chars else 'en'
+
+# Шаблоны, которые плагины применяют при каждом вызове
+_WHITESPACE_RE = re.compile(r'\s+')
+_PUNCTUATION_SPLIT_RE = re.compile(r'([.!?]+)')
+_SENTENCE_END_RE = re.compile(r'[.!?]+')
+_KEYWORD_RE = re.compile(r'\b\w{4,}\b')
+
+# Повторяющийся знак препинания и, если есть, следующая за ним буква
+_PUNCTUATION_FIX_RE = re.compile(r'([.!?])\1*(?P<next>[а-яa-z])?', re.IGNORECASE)
+
+def _fix_punctuation(match: re.Match) -> str:
+    """Схлопывает повторы знака и отделяет следующее слово пробелом"""
+    next_char = match.group('next')
+    return match.group(1) + ' ' + next_char if next_char else match.group(1)
+
 class TextProcessorPlugin(ABC):
     """Абстрактный базовый класс для плагинов обработки текста"""
     
@@ -42,14 +68,14 @@ class PunctuationPlugin(TextProcessorPlugin):
             return text
         
         # Базовая очистка
-        text = re.sub(r'\s+', ' ', text.strip())
+        text = _WHITESPACE_RE.sub(' ', text.strip())
         
         # Добавляем точку в конец если нет пунктуации
         if text and text[-1] not in '.!?…':
             text += '.'
         
         # Заглавные буквы в начале предложений
-        sentences = re.split(r'([.!?]+)', text)
+        sentences = _PUNCTUATION_SPLIT_RE.split(text)
         result = []
         
         for i, part in enumerate(sentences):
@@ -65,11 +91,9 @@ class PunctuationPlugin(TextProcessorPlugin):
         
         text = ''.join(result)
         
-        # Исправление множественных знаков препинания
-        text = re.sub(r'([.!?])\1+', r'\1', text)
-        
-        # Добавление пробелов после знаков препинания
-        text = re.sub(r'([.!?])([а-яa-z])', r'\1 \2', text, flags=re.IGNORECASE)
+        # Исправление множественных знаков препинания и добавление
+        # пробелов после них за один проход
+        text = _PUNCTUATION_FIX_RE.sub(_fix_punctuation, text)
         
         return text
 
@@ -95,6 +119,54 @@ class SpellingCorrectionPlugin(TextProcessorPlugin):
                 'dunno': 'don\'t know', 'lemme': 'let me'
             }
         }
+        
+        # Все многобуквенные ошибки языка собираются в одно регулярное
+        # выражение, чтобы текст просматривался один раз, а не по разу на слово
+        self.mistake_patterns = {}
+        # Ключи приведены через casefold(): под IGNORECASE совпадение может
+        # содержать символы вроде 'ſ', у которых lower() не дает ключ словаря
+        self.folded_mistakes = {}
+        # Совпадения, которых нет и среди casefold-ключей, после первого поиска
+        self.resolved_words = {}
+        # Однобуквенные слова ('u', 'r') заменяются одним проходом
+        # по классу символов вместо отдельного re.sub на каждое слово
+        self.single_char_patterns = {}
+        for language, mistakes in self.common_mistakes.items():
+            # Длинные слова идут первыми, чтобы из пересекающихся вариантов
+            # ('чё'/'чёто', 'ща'/'щас') всегда выбиралось самое длинное
+            multi = sorted((wrong for wrong in mistakes if len(wrong) > 1), key=len, reverse=True)
+            self.folded_mistakes[language] = {
+                wrong.casefold(): correct for wrong, correct in mistakes.items()
+            }
+            self.resolved_words[language] = {}
+            if multi:
+                # Используем границы слов чтобы не заменять части слов
+                self.mistake_patterns[language] = re.compile(
+                    r'\b(?:' + '|'.join(map(re.escape, multi)) + r')\b', re.IGNORECASE
+                )
+            
+            single = [wrong for wrong in mistakes if len(wrong) == 1]
+            if single:
+                self.single_char_patterns[language] = re.compile(
+                    r'\b[' + ''.join(map(re.escape, single)) + r']\b', re.IGNORECASE
+                )
+    
+    def _correction(self, language: str, word: str) -> str:
+        """Возвращает исправление для слова, найденного шаблоном языка"""
+        correct = self.folded_mistakes[language].get(word.casefold())
+        if correct is None:
+            resolved = self.resolved_words[language]
+            correct = resolved.get(word)
+            if correct is None:
+                # Под IGNORECASE 'ı' и 'İ' совпадают с 'i', но casefold() дает для них
+                # другой ключ: ищем запись тем же сравнением, что и шаблон
+                correct = next(
+                    (right for wrong, right in self.common_mistakes[language].items()
+                     if re.fullmatch(re.escape(wrong), word, re.IGNORECASE)),
+                    word
+                )
+                resolved[word] = correct
+        return correct
     
     @property
     def name(self) -> str:
@@ -104,22 +176,20 @@ class SpellingCorrectionPlugin(TextProcessorPlugin):
     def description(self) -> str:
         return "Исправляет частые орфографические ошибки и сленг"
     
-    def _detect_language(self, text: str) -> str:
-        """Определяет язык текста"""
-        ru_chars = len(re.findall(r'[а-яё]', text.lower()))
-        en_chars = len(re.findall(r'[a-z]', text.lower()))
-        return 'ru' if ru_chars > en_chars else 'en'
-    
     def process(self, text: str, context: Dict[str, Any] = None) -> str:
         if not text:
             return text
         
-        language = self._detect_language(text)
-        mistakes = self.common_mistakes.get(language, {})
+        language = _detect_language(text)
+        correct = lambda m: self._correction(language, m.group(0))
+        
+        pattern = self.mistake_patterns.get(language)
+        if pattern:
+            text = pattern.sub(correct, text)
         
-        for wrong, correct in mistakes.items():
-            # Используем границы слов чтобы не заменять части слов
-            text = re.sub(r'\b' + re.escape(wrong) + r'\b', correct, text, flags=re.IGNORECASE)
+        single_pattern = self.single_char_patterns.get(language)
+        if single_pattern:
+            text = single_pattern.sub(correct, text)
         
         return text
 
@@ -143,7 +213,7 @@ class KeywordExtractorPlugin(TextProcessorPlugin):
         
         try:
             # Извлекаем слова (игнорируем стоп-слова)
-            words = re.findall(r'\b\w{4,}\b', text.lower())
+            words = _KEYWORD_RE.findall(text.lower())
             
             # Подсчитываем частоту
             word_freq = Counter(words)
@@ -180,7 +250,7 @@ class TextSummaryPlugin(TextProcessorPlugin):
         
         try:
             # Простая суммаризация - берем первые 3 предложения
-            sentences = re.split(r'[.!?]+', text)
+            sentences = _SENTENCE_END_RE.split(text)
             valid_sentences = [s.strip() for s in sentences if len(s.strip()) > 10]
             
             if len(valid_sentences) <= 3:
@@ -230,16 +300,11 @@ class EmotionDetectionPlugin(TextProcessorPlugin):
     def description(self) -> str:
         return "Анализирует эмоциональную окраску текста"
     
-    def _detect_language(self, text: str) -> str:
-        ru_chars = len(re.findall(r'[а-яё]', text.lower()))
-        en_chars = len(re.findall(r'[a-z]', text.lower()))
-        return 'ru' if ru_chars > en_chars else 'en'
-    
     def process(self, text: str, context: Dict[str, Any] = None) -> str:
         if not text:
             return text
         
-        language = self._detect_language(text)
+        language = _detect_language(text)
         text_lower = text.lower()
         
         positive_count = 0
@@ -4,6 +4,19 @@ from typing import List
 
 logger = logging.getLogger(__name__)
 
+# Шаблоны подсчета букв для определения языка
+_RU_CHARS_RE = re.compile(r'[а-яё]', re.IGNORECASE)
+_EN_CHARS_RE = re.compile(r'[a-z]', re.IGNORECASE)
+
+# Служебные шаблоны очистки текста компилируются один раз при импорте
+_WHITESPACE_RE = re.compile(r'\s+')
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s\.,!?;:()\-—]')
+_UNICODE_ESCAPE_RE = re.compile(r'\\u\d+')
+_SENTENCE_SPLIT_RE = re.compile(r'([.!?]+\s*)')
+_SENTENCE_START_RE = re.compile(r'([.!?]\s+)([a-zа-я])')
+_SPACE_BEFORE_PUNCT_RE = re.compile(r'\s+([.,!?;:])')
+_SPACE_AFTER_PUNCT_RE = re.compile(r'([.,!?;:])\s+')
+
 class TextEnhancer:
     """Класс для улучшения распознанного текста"""
     
@@ -13,23 +26,23 @@ class TextEnhancer:
     def setup_enhancement_rules(self):
         """Настройка правил улучшения текста"""
         # Правила для исправления частых ошибок распознавания
-        self.common_fixes = [
+        self.common_fixes = {
             # Русский язык
-            (r'\bнаверное\b', 'наверное'),
-            (r'\bвозможно\b', 'возможно'),
-            (r'\bконечно\b', 'конечно'),
-            (r'\bвообще\b', 'вообще'),
-            (r'\bнапример\b', 'например'),
-            (r'\bпожалуйста\b', 'пожалуйста'),
+            'наверное': 'наверное',
+            'возможно': 'возможно',
+            'конечно': 'конечно',
+            'вообще': 'вообще',
+            'например': 'например',
+            'пожалуйста': 'пожалуйста',
             
             # Английский язык
-            (r'\bprobably\b', 'probably'),
-            (r'\bpossible\b', 'possible'),
-            (r'\bcertainly\b', 'certainly'),
-            (r'\bgenerally\b', 'generally'),
-            (r'\bfor example\b', 'for example'),
-            (r'\bplease\b', 'please'),
-        ]
+            'probably': 'probably',
+            'possible': 'possible',
+            'certainly': 'certainly',
+            'generally': 'generally',
+            'for example': 'for example',
+            'please': 'please',
+        }
         
         # Правила пунктуации
         self.punctuation_rules = [
@@ -40,6 +53,24 @@ class TextEnhancer:
             # Добавление точек в конец предложений
             (r'[а-яa-z0-9]((?![.?!/])\S)*$', lambda m: m.group(0) + '.'),
         ]
+        
+        # Компилируем правила один раз, а не при каждом вызове;
+        # все общие исправления применяются одним проходом, длинные
+        # варианты проверяются первыми
+        self.common_fixes_pattern = re.compile(
+            r'\b(?:' + '|'.join(map(re.escape, sorted(self.common_fixes, key=len, reverse=True))) + r')\b', re.IGNORECASE
+        )
+        # Совпадение ищется по ключу casefold(): под IGNORECASE оно может
+        # содержать символы вроде 'ſ', у которых lower() не дает ключ словаря
+        self.folded_fixes = {wrong.casefold(): correct for wrong, correct in self.common_fixes.items()}
+        # Исправления для редких написаний, найденные перебором в _common_fix
+        self.resolved_fixes = {}
+        # Правило выбирается поиском без учета регистра, а замена
+        # выполняется с учетом регистра
+        self.punctuation_rules = [
+            (re.compile(pattern, re.IGNORECASE), re.compile(pattern), replacement)
+            for pattern, replacement in self.punctuation_rules
+        ]
     
     def enhance_text(self, text: str, custom_rules: List = None) -> str:
         """
@@ -78,21 +109,35 @@ class TextEnhancer:
     def clean_text(self, text: str) -> str:
         """Очистка текста от артефактов распознавания"""
         # Удаление лишних пробелов
-        text = re.sub(r'\s+', ' ', text)
+        text = _WHITESPACE_RE.sub(' ', text)
         
         # Удаление специальных символов (кроме пунктуации)
-        text = re.sub(r'[^\w\s\.,!?;:()\-—]', '', text)
+        text = _SPECIAL_CHARS_RE.sub('', text)
         
         # Исправление common OCR/ASR ошибок
-        text = re.sub(r'\\u\d+', '', text)  # Unicode escape sequences
+        text = _UNICODE_ESCAPE_RE.sub('', text)  # Unicode escape sequences
         
         return text.strip()
     
     def apply_common_fixes(self, text: str) -> str:
         """Применение общих исправлений"""
-        for pattern, replacement in self.common_fixes:
-            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
-        return text
+        return self.common_fixes_pattern.sub(lambda m: self._common_fix(m.group(0)), text)
+    
+    def _common_fix(self, word: str) -> str:
+        """Возвращает исправление для слова, найденного общим шаблоном"""
+        correct = self.folded_fixes.get(word.casefold())
+        if correct is None:
+            correct = self.resolved_fixes.get(word)
+            if correct is None:
+                # Шаблон считает 'ı' и 'İ' равными 'i', а casefold() - нет, поэтому
+                # слово сверяется с записями тем же способом, что и в шаблоне
+                correct = next(
+                    (right for wrong, right in self.common_fixes.items()
+                     if re.fullmatch(re.escape(wrong), word, re.IGNORECASE)),
+                    word
+                )
+                self.resolved_fixes[word] = correct
+        return correct
     
     def apply_custom_rules(self, text: str, rules: List) -> str:
         """Применение пользовательских правил"""
@@ -102,8 +147,14 @@ class TextEnhancer:
     
     def enhance_punctuation(self, text: str) -> str:
         """Улучшение пунктуации"""
+        # Короткая фраза без знаков конца предложения - типичный ответ
+        # распознавания голосового сообщения, разбивать её не нужно
+        if '.' not in text and '!' not in text and '?' not in text:
+            sentence = text.strip()
+            return self._punctuate_sentence(sentence, '') if sentence else ''
+        
         # Разбиваем на предложения (грубо)
-        sentences = re.split(r'([.!?]+\s*)', text)
+        sentences = _SENTENCE_SPLIT_RE.split(text)
         enhanced_sentences = []
         
         for i in range(0, len(sentences), 2):
@@ -112,23 +163,26 @@ class TextEnhancer:
                 punctuation = sentences[i+1] if i+1 < len(sentences) else ''
                 
                 if sentence:
-                    # Применяем правила пунктуации
-                    for pattern, replacement in self.punctuation_rules:
-                        if re.search(pattern, sentence, re.IGNORECASE):
-                            if callable(replacement):
-                                sentence = re.sub(pattern, replacement, sentence)
-                            else:
-                                sentence = re.sub(pattern, replacement, sentence)
-                            break
-                    
-                    # Добавляем предложение с пунктуацией
-                    if not punctuation and not sentence.endswith(('.', '!', '?')):
-                        sentence += '.'
-                    
-                    enhanced_sentences.append(sentence + punctuation)
+                    enhanced_sentences.append(self._punctuate_sentence(sentence, punctuation))
         
         return ' '.join(enhanced_sentences)
     
+    def _punctuate_sentence(self, sentence: str, punctuation: str) -> str:
+        """Расставляет пунктуацию в одном предложении"""
+        # Применяем правила пунктуации
+        # Побеждает первое правило, найденное без учета регистра. Обычно
+        # замена с учетом регистра срабатывает сразу, и второй поиск не нужен
+        for search_pattern, sub_pattern, replacement in self.punctuation_rules:
+            sentence, count = sub_pattern.subn(replacement, sentence)
+            if count or search_pattern.search(sentence):
+                break
+        
+        # Добавляем предложение с пунктуацией
+        if not punctuation and not sentence.endswith(('.', '!', '?')):
+            sentence += '.'
+        
+        return sentence + punctuation
+    
     def fix_capitalization(self, text: str) -> str:
         """Исправление регистра букв"""
         # Первая буква первого предложения - заглавная
@@ -136,26 +190,25 @@ class TextEnhancer:
             text = text[0].upper() + text[1:]
         
         # После точки, восклицательного или вопросительного знака - заглавная
-        text = re.sub(r'([.!?]\s+)([a-zа-я])', 
-                     lambda m: m.group(1) + m.group(2).upper(), text)
+        text = _SENTENCE_START_RE.sub(lambda m: m.group(1) + m.group(2).upper(), text)
         
         return text
     
     def remove_extra_spaces(self, text: str) -> str:
         """Удаление лишних пробелов"""
         # Удаление пробелов вокруг пунктуации
-        text = re.sub(r'\s+([.,!?;:])', r'\1', text)
-        text = re.sub(r'([.,!?;:])\s+', r'\1 ', text)
+        text = _SPACE_BEFORE_PUNCT_RE.sub(r'\1', text)
+        text = _SPACE_AFTER_PUNCT_RE.sub(r'\1 ', text)
         
         # Удаление множественных пробелов
-        text = re.sub(r'\s+', ' ', text)
+        text = _WHITESPACE_RE.sub(' ', text)
         
         return text.strip()
     
     def detect_language(self, text: str) -> str:
         """Определение языка текста"""
-        russian_chars = len(re.findall(r'[а-яё]', text, re.IGNORECASE))
-        english_chars = len(re.findall(r'[a-z]', text, re.IGNORECASE))
+        russian_chars = len(_RU_CHARS_RE.findall(text))
+        english_chars = len(_EN_CHARS_RE.findall(text))
         
         if russian_chars > english_chars:
             return 'ru'
@@ -1,11 +1,58 @@
 import os
-import json
+import mmap
+import asyncio
 import logging
-from vosk import Model, KaldiRecognizer
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import wave
 
+# orjson разбирает небольшие JSON-ответы Vosk в несколько раз быстрее json
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 logger = logging.getLogger(__name__)
 
+# Записи короче этого порога (типичные голосовые сообщения) передаются
+# в Vosk одним куском вместо потокового чтения
+SHORT_AUDIO_SECONDS = 30
+
+def _iter_pcm(audio_file, wf, chunk_frames=16000):
+    """
+    Отдает PCM-данные срезами отображенного в память файла, минуя слой
+    чанков wave. После wave.open файл стоит на начале блока данных.
+    """
+    if wf.getnframes() < SHORT_AUDIO_SECONDS * wf.getframerate():
+        chunk_frames = wf.getnframes()
+    
+    frame_size = wf.getsampwidth() * wf.getnchannels()
+    chunk_size = chunk_frames * frame_size
+    offset = audio_file.tell()
+    end = offset + wf.getnframes() * frame_size
+    if end <= offset:
+        return
+    
+    with mmap.mmap(audio_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # Заголовок может обещать больше данных, чем есть в файле
+        end = min(end, len(mm))
+        while offset < end:
+            yield mm[offset:min(offset + chunk_size, end)]
+            offset += chunk_size
+
+def _decode_stream(recognizer, audio_file, wf, chunk_frames=16000):
+    """
+    Прогоняет аудио через распознаватель и отдает разобранные результаты
+    Vosk: промежуточные по мере готовности и финальный в конце.
+    Чанк по умолчанию - 1 секунда при 16 кГц.
+    """
+    accept = recognizer.AcceptWaveform
+    for data in _iter_pcm(audio_file, wf, chunk_frames):
+        if accept(data):
+            yield json_loads(recognizer.Result())
+    yield json_loads(recognizer.FinalResult())
+
 class VoskRecognizer:
     """Класс для распознавания речи с помощью Vosk"""
     
@@ -13,21 +60,65 @@ class VoskRecognizer:
         self.models = {}
         self.available_languages = []
         
-        # Загружаем модели для каждого языка
+        # Пул распознавателей: (язык, частота) -> свободные экземпляры.
+        # Создание KaldiRecognizer дорогое, поэтому они переиспользуются через Reset()
+        self._recognizer_pool = {}
+        self._pool_lock = threading.Lock()
+        
+        # Пул потоков для асинхронного распознавания: Vosk отпускает GIL,
+        # поэтому несколько файлов декодируются параллельно
+        self._executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 2)
+        
+        # vosk тянет тяжелое нативное расширение, импортируем его только здесь
+        from vosk import Model
+        
+        # Загружаем модели для каждого языка параллельно: загрузка идет
+        # в нативном коде и отпускает GIL
+        existing_paths = {}
         for lang, path in model_paths.items():
             if os.path.exists(path):
-                try:
-                    self.models[lang] = Model(path)
-                    self.available_languages.append(lang)
-                    logger.info(f"✅ Модель Vosk для языка '{lang}' загружена: {path}")
-                except Exception as e:
-                    logger.error(f"❌ Ошибка загрузки модели {lang}: {e}")
+                existing_paths[lang] = path
             else:
                 logger.warning(f"⚠️ Модель Vosk не найдена: {path}")
         
+        if existing_paths:
+            max_workers = min(len(existing_paths), os.cpu_count() or 4)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(Model, path): lang for lang, path in existing_paths.items()}
+                for future in as_completed(futures):
+                    lang = futures[future]
+                    try:
+                        self.models[lang] = future.result()
+                        logger.info(f"✅ Модель Vosk для языка '{lang}' загружена: {existing_paths[lang]}")
+                    except Exception as e:
+                        logger.error(f"❌ Ошибка загрузки модели {lang}: {e}")
+        
+        # Сохраняем порядок языков из конфигурации
+        self.available_languages = [lang for lang in model_paths if lang in self.models]
+        
         if not self.models:
             raise Exception("Не удалось загрузить ни одну модель Vosk!")
     
+    @contextmanager
+    def _recognizer(self, language, sample_rate):
+        """Выдает распознаватель из пула и возвращает его туда после использования"""
+        key = (language, sample_rate)
+        with self._pool_lock:
+            idle = self._recognizer_pool.get(key)
+            recognizer = idle.pop() if idle else None
+        
+        if recognizer is None:
+            from vosk import KaldiRecognizer
+            recognizer = KaldiRecognizer(self.models[language], sample_rate)
+        recognizer.SetWords(True)
+        
+        try:
+            yield recognizer
+        finally:
+            recognizer.Reset()
+            with self._pool_lock:
+                self._recognizer_pool.setdefault(key, []).append(recognizer)
+    
     def get_available_languages(self):
         """Возвращает список доступных языков"""
         return self.available_languages
@@ -43,7 +134,7 @@ class VoskRecognizer:
         
         try:
             # Открываем аудиофайл
-            with wave.open(audio_path, 'rb') as wf:
+            with open(audio_path, 'rb') as audio_file, wave.open(audio_file, 'rb') as wf:
                 # Проверяем формат аудио
                 if wf.getnchannels() != 1:
                     return "Ошибка: Аудио должно быть моно (1 канал)"
@@ -51,27 +142,14 @@ class VoskRecognizer:
                 if wf.getsampwidth() != 2:
                     return "Ошибка: Поддерживается только 16-битное аудио"
                 
-                # Создаем распознаватель
-                recognizer = KaldiRecognizer(self.models[language], wf.getframerate())
-                recognizer.SetWords(True)
-                
-                results = []
-                
-                # Читаем и распознаем данные
-                while True:
-                    data = wf.readframes(4000)
-                    if len(data) == 0:
-                        break
-                    
-                    if recognizer.AcceptWaveform(data):
-                        result = json.loads(recognizer.Result())
-                        if 'text' in result and result['text']:
-                            results.append(result['text'])
-                
-                # Получаем финальный результат
-                final_result = json.loads(recognizer.FinalResult())
-                if 'text' in final_result and final_result['text']:
-                    results.append(final_result['text'])
+                # Берем распознаватель из пула
+                with self._recognizer(language, wf.getframerate()) as recognizer:
+                    # Читаем и распознаем данные
+                    results = [
+                        result['text']
+                        for result in _decode_stream(recognizer, audio_file, wf)
+                        if result.get('text')
+                    ]
                 
                 # Объединяем все результаты
                 full_text = ' '.join(results).strip()
@@ -82,11 +160,24 @@ class VoskRecognizer:
                 else:
                     return "Не удалось распознать речь. Возможно, в аудио нет речи или качество слишком низкое."
         
+        except (FileNotFoundError, EOFError, wave.Error) as e:
+            # Файла нет (FileNotFoundError), он пустой (EOFError) или это не WAV (wave.Error)
+            logger.error(f"Аудиофайл не найден или поврежден: {audio_path}: {e}")
+            return "Ошибка: аудиофайл не найден или поврежден"
+        
         except Exception as e:
             error_msg = f"Ошибка распознавания: {str(e)}"
             logger.error(error_msg)
             return error_msg
     
+    async def recognize_audio_async(self, audio_path, language='ru'):
+        """
+        Асинхронная версия recognize_audio: распознавание выполняется
+        в пуле потоков и не блокирует event loop бота
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.recognize_audio, audio_path, language)
+    
     def recognize_with_timestamps(self, audio_path, language='ru'):
         """
         Распознает речь с временными метками
@@ -95,28 +186,19 @@ class VoskRecognizer:
             return None
         
         try:
-            with wave.open(audio_path, 'rb') as wf:
-                recognizer = KaldiRecognizer(self.models[language], wf.getframerate())
-                recognizer.SetWords(True)
-                
-                results = []
-                
-                while True:
-                    data = wf.readframes(4000)
-                    if len(data) == 0:
-                        break
-                    
-                    if recognizer.AcceptWaveform(data):
-                        result = json.loads(recognizer.Result())
+            with open(audio_path, 'rb') as audio_file, wave.open(audio_file, 'rb') as wf:
+                with self._recognizer(language, wf.getframerate()) as recognizer:
+                    results = []
+                    for result in _decode_stream(recognizer, audio_file, wf):
                         if 'result' in result:
                             results.extend(result['result'])
                 
-                final_result = json.loads(recognizer.FinalResult())
-                if 'result' in final_result:
-                    results.extend(final_result['result'])
-                
                 return results
         
+        except (FileNotFoundError, EOFError, wave.Error) as e:
+            logger.error(f"Аудиофайл не найден или поврежден: {audio_path}: {e}")
+            return None
+        
         except Exception as e:
             logger.error(f"Ошибка распознавания с временными метками: {e}")
             return None
@@ -7,6 +7,7 @@ from typing import List, Dict, Optional
 import threading
 import time
 import sqlite3
+from operator import itemgetter
 
 logger = logging.getLogger(__name__)
 
@@ -327,7 +328,7 @@ class BackupService:
                     total_size += stat.st_size
             
             # Сортируем по дате создания (новые сначала)
-            backups.sort(key=lambda x: x['created'], reverse=True)
+            backups.sort(key=itemgetter('created'), reverse=True)
             
             return {
                 'backup_dir': self.backup_dir,
@@ -1,36 +1,81 @@
 import os
+import shutil
 import platform
 import subprocess
 import logging
+from functools import lru_cache
 from typing import Dict, List
 
 logger = logging.getLogger(__name__)
 
+_PROBE_TIMEOUT = 5  # секунды на одну проверку
+
+# Статичный блок рекомендаций для Windows в руководстве по настройке
+_WINDOWS_GUIDE = """
+
+РЕКОМЕНДАЦИИ ДЛЯ WINDOWS:
+
+1. Установите FFmpeg:
+   - Скачайте с https://ffmpeg.org/download.html
+   - Распакуйте в C:\\ffmpeg
+   - Добавьте C:\\ffmpeg\\bin в системный PATH
+
+2. Установите eSpeak (опционально для синтеза речи):
+   - Скачайте с http://espeak.sourceforge.net/download.html
+   - Установите и добавьте в PATH
+
+3. Перезапустите командную строку после изменения PATH
+"""
+
+# platform.* на Windows может запускать внешние команды (ver),
+# поэтому сведения о системе вычисляются один раз за процесс
+_SYSTEM = platform.system().lower()
+
+@lru_cache(maxsize=1)
+def _system_info() -> Dict:
+    """Собирает неизменяемую информацию о системе"""
+    return {
+        'system': platform.system(),
+        'release': platform.release(),
+        'version': platform.version(),
+        'architecture': platform.architecture(),
+        'processor': platform.processor(),
+        'python_version': platform.python_version()
+    }
+
 class SystemChecker:
     """Проверка системных зависимостей для Windows"""
     
     def __init__(self):
-        self.system = platform.system().lower()
+        self.system = _SYSTEM
         self.dependencies = {
             'ffmpeg': {
-                'check_command': ['ffmpeg', '-version'] if self.system != 'windows' else ['where', 'ffmpeg'],
+                'check_command': ['ffmpeg', '-version'],
+                'version_required': False,
                 'install_windows': 'Скачайте ffmpeg с https://ffmpeg.org/download.html и добавьте в PATH',
                 'install_linux': 'sudo apt-get install ffmpeg',
                 'required': True
             },
             'espeak': {
-                'check_command': ['espeak', '--version'] if self.system != 'windows' else ['where', 'espeak'],
+                'check_command': ['espeak', '--version'],
+                'version_required': False,
                 'install_windows': 'Скачайте eSpeak с http://espeak.sourceforge.net/download.html',
                 'install_linux': 'sudo apt-get install espeak espeak-data',
                 'required': False
             },
             'python': {
                 'check_command': ['python', '--version'],
+                'version_required': False,
                 'install_windows': 'Скачайте с https://python.org',
                 'install_linux': 'sudo apt-get install python3',
                 'required': True
             }
         }
+        
+        # Инструкция по установке зависит только от системы - выбираем ее один раз
+        install_key = 'install_windows' if self.system == 'windows' else 'install_linux'
+        for dep_info in self.dependencies.values():
+            dep_info['install_guide'] = dep_info[install_key]
     
     def check_dependencies(self) -> Dict[str, Dict]:
         """Проверяет все системные зависимости"""
@@ -38,18 +83,21 @@ class SystemChecker:
         
         for dep_name, dep_info in self.dependencies.items():
             try:
-                if self.system == 'windows':
-                    result = subprocess.run(dep_info['check_command'], 
-                                          capture_output=True, text=True, shell=True)
-                else:
-                    result = subprocess.run(dep_info['check_command'], 
-                                          capture_output=True, text=True)
+                # Поиск в PATH без запуска процессов (то же, что делают where/which)
+                path = shutil.which(dep_info['check_command'][0])
+                is_available = path is not None
                 
-                is_available = result.returncode == 0
+                # Версию запрашиваем, только если она действительно нужна.
+                # Без shell=True: на Windows не запускается лишний cmd.exe
+                if is_available and dep_info.get('version_required'):
+                    result = subprocess.run([path] + dep_info['check_command'][1:],
+                                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                            timeout=_PROBE_TIMEOUT)
+                    is_available = result.returncode == 0
                 results[dep_name] = {
                     'available': is_available,
                     'message': f"{dep_name} {'найден' if is_available else 'не найден'}",
-                    'install_guide': dep_info[f'install_{self.system}'] if self.system in ['windows', 'linux'] else dep_info['install_linux'],
+                    'install_guide': dep_info['install_guide'],
                     'required': dep_info['required']
                 }
                 
@@ -65,7 +113,7 @@ class SystemChecker:
                 results[dep_name] = {
                     'available': False,
                     'message': f"Ошибка проверки {dep_name}: {e}",
-                    'install_guide': dep_info[f'install_{self.system}'] if self.system in ['windows', 'linux'] else dep_info['install_linux'],
+                    'install_guide': dep_info['install_guide'],
                     'required': dep_info['required']
                 }
                 logger.error(f"❌ Ошибка проверки {dep_name}: {e}")
@@ -74,14 +122,7 @@ class SystemChecker:
     
     def get_system_info(self) -> Dict:
         """Возвращает информацию о системе"""
-        return {
-            'system': platform.system(),
-            'release': platform.release(),
-            'version': platform.version(),
-            'architecture': platform.architecture(),
-            'processor': platform.processor(),
-            'python_version': platform.python_version()
-        }
+        return dict(_system_info())
     
     def check_disk_space(self, path='.') -> Dict:
         """Проверяет свободное место на диске"""
@@ -103,40 +144,26 @@ class SystemChecker:
         deps_status = self.check_dependencies()
         system_info = self.get_system_info()
         
-        guide = f"""
+        parts = [f"""
 === РУКОВОДСТВО ПО НАСТРОЙКЕ СИСТЕМЫ ===
 
 Система: {system_info['system']} {system_info['release']}
 Python: {system_info['python_version']}
 
 СТАТУС ЗАВИСИМОСТЕЙ:
-"""
+"""]
         
         for dep_name, status in deps_status.items():
             icon = "✅" if status['available'] else "❌"
-            guide += f"\n{icon} {dep_name}: {status['message']}"
+            parts.append(f"\n{icon} {dep_name}: {status['message']}")
             if not status['available']:
-                guide += f"\n   Установка: {status['install_guide']}"
+                parts.append(f"\n   Установка: {status['install_guide']}")
         
         # Добавляем рекомендации для Windows
         if self.system == 'windows':
-            guide += """
-
-РЕКОМЕНДАЦИИ ДЛЯ WINDOWS:
-
-1. Установите FFmpeg:
-   - Скачайте с https://ffmpeg.org/download.html
-   - Распакуйте в C:\\ffmpeg
-   - Добавьте C:\\ffmpeg\\bin в системный PATH
-
-2. Установите eSpeak (опционально для синтеза речи):
-   - Скачайте с http://espeak.sourceforge.net/download.html
-   - Установите и добавьте в PATH
-
-3. Перезапустите командную строку после изменения PATH
-"""
+            parts.append(_WINDOWS_GUIDE)
         
-        return guide
+        return ''.join(parts)
 
 # Глобальный проверщик системы
 system_checker = SystemChecker()
\ No newline at end of file
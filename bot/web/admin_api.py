@@ -1,239 +1,383 @@
+import io
 import os
+import time
+import hashlib
+import itertools
 import logging
 import threading
 import asyncio
-from typing import Dict, Any, Optional
+from functools import cached_property
+from typing import Dict, Any, Literal, Optional
 from datetime import datetime
 import json
 
 logger = logging.getLogger(__name__)
 
+# Поля пользователя в порядке столбцов Database.get_users_page
+_USER_FIELDS = ("user_id", "username", "first_name", "last_name", "total_requests", "last_active")
+_TAIL_BLOCK_SIZE = 64 * 1024
+# Имя текущего файла логов и момент (следующая местная полночь), до которого оно верно
+_log_name_cache = (0.0, "")
+# Последний прочитанный хвост лога: ((путь, строки, mtime, размер), строки)
+_log_tail_cache = None
+
+
+def _today_log_name() -> str:
+    """Возвращает имя сегодняшнего файла логов, пересчитывая его раз в сутки"""
+    global _log_name_cache
+    now = time.time()
+    if now >= _log_name_cache[0]:
+        lt = time.localtime(now)
+        next_midnight = time.mktime((lt.tm_year, lt.tm_mon, lt.tm_mday + 1, 0, 0, 0, 0, 0, -1))
+        _log_name_cache = (next_midnight, time.strftime("bot_log_%Y%m%d.log", lt))
+    return _log_name_cache[1]
+
+
+def _count_lines(f, size: int) -> int:
+    """Считает строки файла блоками, не загружая его целиком"""
+    f.seek(0)
+    total = 0
+    last = b""
+    for block in iter(lambda: f.read(_TAIL_BLOCK_SIZE), b""):
+        total += block.count(b"\n")
+        last = block
+    if size and not last.endswith(b"\n"):
+        total += 1
+    return total
+
+
+def _tail_offset(f, size: int, lines: int) -> int:
+    """Находит смещение, с которого начинаются последние lines строк файла"""
+    if size == 0:
+        return 0
+    f.seek(size - 1)
+    # Перевод строки в конце файла завершает последнюю строку, а не начинает новую
+    wanted = lines + (1 if f.read(1) == b"\n" else 0)
+    pos = size
+    seen = 0
+    while pos > 0:
+        step = min(_TAIL_BLOCK_SIZE, pos)
+        pos -= step
+        f.seek(pos)
+        block = f.read(step)
+        count = block.count(b"\n")
+        if seen + count >= wanted:
+            index = len(block)
+            for _ in range(wanted - seen):
+                index = block.rindex(b"\n", 0, index)
+            return pos + index + 1
+        seen += count
+    return 0
+
+
+def _read_log_tail(path: str, lines: int, include_total: bool = False):
+    """Читает последние строки файла с конца и, по запросу, общее число строк"""
+    global _log_tail_cache
+    st = os.stat(path)
+    key = (path, lines, st.st_mtime_ns, st.st_size)
+    cached = _log_tail_cache
+    
+    with open(path, 'rb') as f:
+        if cached is not None and cached[0] == key:
+            tail = cached[1]
+        else:
+            f.seek(_tail_offset(f, st.st_size, lines))
+            data = f.read(st.st_size - f.tell())
+            with io.TextIOWrapper(io.BytesIO(data), encoding='utf-8') as text:
+                tail = text.readlines()[-lines:]
+            _log_tail_cache = (key, tail)
+        
+        total = _count_lines(f, st.st_size) if include_total else None
+    
+    return tail, total
+
+
+def _iter_log_tail(path: str, lines: int, as_ndjson: bool = False):
+    """Отдает последние строки файла по частям: как есть или как NDJSON"""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        offset = _tail_offset(f, size, lines)
+        f.seek(offset)
+        
+        if not as_ndjson:
+            remaining = size - offset
+            while remaining > 0:
+                block = f.read(min(_TAIL_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                remaining -= len(block)
+                yield block
+            return
+        
+        import orjson
+        batch = []
+        text = io.TextIOWrapper(f, encoding='utf-8')
+        for line in itertools.islice(text, lines):
+            batch.append(orjson.dumps({"line": line}))
+            batch.append(b"\n")
+            if len(batch) >= 512:
+                yield b"".join(batch)
+                batch.clear()
+        if batch:
+            yield b"".join(batch)
+
+
 class AdminAPI:
     """Веб-интерфейс для администрирования бота с использованием FastAPI"""
     
     def __init__(self, host: str = "0.0.0.0", port: int = 8000):
         self.host = host
         self.port = port
-        self.app = None
         self.thread = None
+        self.server = None
+        self._start_lock = threading.Lock()
         self.is_running = False
-        self.stats_cache = {}
         self.cache_timeout = 30  # секунды
+        # Однослотовый кэш /api/stats: готовый JSON и момент его устаревания
+        self._stats_expiry = 0.0
+        self._stats_payload = None
+        self._stats_etag = None
+        self._stats_lock = asyncio.Lock()
         
-    def _setup_fastapi(self) -> bool:
-        """Настраивает FastAPI приложение"""
+    @cached_property
+    def app(self):
+        """FastAPI приложение; собирается один раз при первом обращении (None, если не собрано)"""
+        return self._setup_fastapi()
+    
+    def _setup_fastapi(self):
+        """Собирает FastAPI приложение или возвращает None, если это не удалось"""
         try:
-            from fastapi import FastAPI, HTTPException
+            from fastapi import FastAPI
             from fastapi.middleware.cors import CORSMiddleware
-            from fastapi.responses import FileResponse
-            from fastapi.staticfiles import StaticFiles
-            
-            self.app = FastAPI(
-                title="Lecture Bot Admin API",
-                description="API для администрирования Telegram бота распознавания речи",
-                version="1.0.0",
-                docs_url="/docs",
-                redoc_url="/redoc"
-            )
-            
-            # Настраиваем CORS
-            self.app.add_middleware(
-                CORSMiddleware,
-                allow_origins=["*"],
-                allow_credentials=True,
-                allow_methods=["*"],
-                allow_headers=["*"],
-            )
-            
-            # Настраиваем маршруты
-            self._setup_routes()
-            
-            # Создаем директорию для статических файлов
-            static_dir = "web/static"
-            os.makedirs(static_dir, exist_ok=True)
-            self.app.mount("/static", StaticFiles(directory=static_dir), name="static")
-            
-            logger.info("✅ FastAPI приложение настроено")
-            return True
-            
+            from fastapi.middleware.gzip import GZipMiddleware
+            from fastapi.responses import ORJSONResponse
         except ImportError as e:
             logger.warning(f"❌ FastAPI не доступен: {e}")
             logger.warning("Установите: pip install fastapi uvicorn")
-            self.app = None
-            return False
+            return None
+        
+        app = FastAPI(
+            title="Lecture Bot Admin API",
+            description="API для администрирования Telegram бота распознавания речи",
+            version="1.0.0",
+            docs_url="/docs",
+            redoc_url="/redoc",
+            default_response_class=ORJSONResponse
+        )
+        
+        # Настраиваем CORS
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=["*"],
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+        
+        # Сжимаем крупные ответы (списки пользователей, логи)
+        app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+        
+        # Настраиваем маршруты. Ошибка импорта здесь - это сервисы бота или orjson,
+        # а не отсутствие FastAPI, поэтому она сообщается отдельно
+        try:
+            self._setup_routes(app)
+        except ImportError as e:
+            logger.error(f"❌ Admin API: не удалось загрузить зависимости маршрутов: {e}")
+            return None
+        
+        # Статика монтируется только по флагу и если директория есть
+        from core.config import config
+        static_dir = "web/static"
+        if config.ADMIN_ENABLE_STATIC and os.path.isdir(static_dir):
+            from fastapi.staticfiles import StaticFiles
+            app.mount("/static", StaticFiles(directory=static_dir), name="static")
+        
+        logger.info("✅ FastAPI приложение настроено")
+        return app
     
-    def _setup_routes(self):
+    def _setup_routes(self, app):
         """Настраивает маршруты API"""
-        from fastapi import HTTPException, Query, Path
+        import orjson
+        from fastapi import HTTPException, Query, Path, Request
+        from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+        from starlette.concurrency import run_in_threadpool
+        # Сервисы импортируются один раз при настройке маршрутов, а не в каждом запросе;
+        # не на уровне модуля, чтобы избежать циклических импортов
+        from core.database import db
+        from core.processing_queue import processing_queue
+        from core.cache_manager import cache_manager
+        from services.backup_service import backup_service
         
-        @self.app.get("/")
-        async def root():
-            return {
-                "message": "Lecture Bot Admin API", 
-                "status": "running",
-                "version": "1.0.0",
-                "timestamp": datetime.now().isoformat()
+        def json_response(request: Request, payload: bytes, etag: str = None, cache_control: str = "no-cache"):
+            """Отдает готовый JSON с ETag, а при совпадении If-None-Match - 304 без тела"""
+            if etag is None:
+                etag = f'"{hashlib.blake2b(payload, digest_size=8).hexdigest()}"'
+            headers = {"ETag": etag, "Cache-Control": cache_control}
+            if_none_match = request.headers.get("if-none-match")
+            if if_none_match and (if_none_match == "*" or etag in if_none_match):
+                return Response(status_code=304, headers=headers)
+            return Response(content=payload, media_type="application/json", headers=headers)
+        
+        def timestamped_body(template: Dict[str, Any]):
+            """Возвращает функцию, отдающую сериализованный шаблон; JSON пересобирается раз в секунду"""
+            cached = [0, b""]
+            
+            def body() -> bytes:
+                now = int(time.time())
+                if now != cached[0]:
+                    cached[1] = orjson.dumps({**template, "timestamp": datetime.fromtimestamp(now)})
+                    cached[0] = now
+                return cached[1]
+            
+            return body
+        
+        root_body = timestamped_body({
+            "message": "Lecture Bot Admin API", 
+            "status": "running",
+            "version": "1.0.0"
+        })
+        health_body = timestamped_body({
+            "status": "healthy",
+            "services": {
+                "database": "ok",
+                "cache": "ok", 
+                "processing_queue": "ok"
             }
+        })
+        
+        @app.get("/")
+        async def root():
+            return Response(content=root_body(), media_type="application/json")
         
-        @self.app.get("/api/health")
+        @app.get("/api/health")
         async def health_check():
             """Проверка здоровья сервиса"""
-            return {
-                "status": "healthy",
-                "timestamp": datetime.now().isoformat(),
-                "services": {
-                    "database": "ok",
-                    "cache": "ok", 
-                    "processing_queue": "ok"
-                }
-            }
+            return Response(content=health_body(), media_type="application/json")
         
-        @self.app.get("/api/stats")
-        async def get_stats(use_cache: bool = True):
+        @app.get("/api/stats")
+        async def get_stats(request: Request, use_cache: bool = True):
             """Возвращает общую статистику бота"""
-            cache_key = "global_stats"
-            
-            if use_cache and cache_key in self.stats_cache:
-                cache_time, data = self.stats_cache[cache_key]
-                if (datetime.now() - cache_time).total_seconds() < self.cache_timeout:
-                    return data
+            stats_cache_control = f"max-age={self.cache_timeout}"
+            if use_cache and time.monotonic() < self._stats_expiry:
+                return json_response(request, self._stats_payload, self._stats_etag, stats_cache_control)
             
             try:
-                # Импортируем здесь, чтобы избежать циклических импортов
-                from core.database import db
-                from core.processing_queue import processing_queue
-                from core.cache_manager import cache_manager
-                
-                # Базовая статистика
-                total_users, total_requests, total_size, total_duration = db.get_global_stats()
-                queue_stats = processing_queue.get_queue_stats()
-                cache_stats = cache_manager.get_cache_stats()
-                avg_rating, total_ratings = db.get_average_rating()
-                
-                data = {
-                    "users": {
-                        "total": total_users,
-                        "active_today": 0,  # Заглушка
-                    },
-                    "requests": {
-                        "total": total_requests,
-                        "total_size_mb": round(total_size / (1024 * 1024), 2),
-                        "total_duration_min": round(total_duration / 60, 1),
-                        "avg_rating": round(avg_rating, 2) if avg_rating else 0,
-                        "total_ratings": total_ratings
-                    },
-                    "system": {
-                        "queue": queue_stats,
-                        "cache": cache_stats,
-                        "uptime": "0:00:00"
-                    },
-                    "timestamp": datetime.now().isoformat()
-                }
-                
-                # Кэшируем результат
-                self.stats_cache[cache_key] = (datetime.now(), data)
+                async with self._stats_lock:
+                    # Повторная проверка: кэш мог обновить параллельный запрос
+                    if use_cache and time.monotonic() < self._stats_expiry:
+                        return json_response(request, self._stats_payload, self._stats_etag, stats_cache_control)
+                    
+                    # Базовая статистика: источники опрашиваются параллельно
+                    global_stats, queue_stats, cache_stats = await asyncio.gather(
+                        run_in_threadpool(db.get_global_stats_combined),
+                        run_in_threadpool(processing_queue.get_queue_stats),
+                        run_in_threadpool(cache_manager.get_cache_stats)
+                    )
+                    total_users, total_requests, total_size, total_duration, avg_rating, total_ratings = global_stats
+                    
+                    data = {
+                        "users": {
+                            "total": total_users,
+                            "active_today": 0,  # Заглушка
+                        },
+                        "requests": {
+                            "total": total_requests,
+                            "total_size_mb": round(total_size / (1024 * 1024), 2),
+                            "total_duration_min": round(total_duration / 60, 1),
+                            "avg_rating": round(avg_rating, 2) if avg_rating else 0,
+                            "total_ratings": total_ratings
+                        },
+                        "system": {
+                            "queue": queue_stats,
+                            "cache": cache_stats,
+                            "uptime": "0:00:00"
+                        },
+                        "timestamp": datetime.now()
+                    }
+                    
+                    # Кэшируем уже сериализованный ответ
+                    payload = orjson.dumps(data)
+                    etag = f'"{hashlib.blake2b(payload, digest_size=8).hexdigest()}"'
+                    self._stats_payload = payload
+                    self._stats_etag = etag
+                    self._stats_expiry = time.monotonic() + self.cache_timeout
                 
-                return data
+                return json_response(request, payload, etag, stats_cache_control)
                 
             except Exception as e:
                 logger.error(f"Ошибка получения статистики: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
         
-        @self.app.get("/api/users")
+        @app.get("/api/users")
         async def get_users(
             limit: int = Query(50, ge=1, le=1000),
             offset: int = Query(0, ge=0),
-            sort_by: str = Query("last_active", regex="^(last_active|total_requests|registration_date)$")
+            sort_by: Literal["last_active", "total_requests", "registration_date"] = Query("last_active")
         ):
             """Возвращает список пользователей с пагинацией"""
             try:
-                from core.database import db
-                users = db.get_all_users()
-                
-                # Сортировка
-                if sort_by == "total_requests":
-                    users.sort(key=lambda x: x[4] if len(x) > 4 else 0, reverse=True)
-                elif sort_by == "registration_date":
-                    users.sort(key=lambda x: x[5] if len(x) > 5 else "", reverse=True)
-                else:  # last_active
-                    users.sort(key=lambda x: x[5] if len(x) > 5 else "", reverse=True)
-                
-                # Пагинация
-                paginated_users = users[offset:offset + limit]
+                # Сортировка и пагинация выполняются в SQL
+                paginated_users = await run_in_threadpool(db.get_users_page, sort_by, limit, offset)
+                total_users = await run_in_threadpool(db.count_users)
                 
-                formatted_users = []
-                for user in paginated_users:
-                    if len(user) >= 6:
-                        formatted_users.append({
-                            "user_id": user[0],
-                            "username": user[1] or "N/A",
-                            "first_name": user[2] or "N/A", 
-                            "last_name": user[3] or "N/A",
-                            "total_requests": user[4],
-                            "last_active": user[5]
-                        })
+                formatted_users = [dict(zip(_USER_FIELDS, user)) for user in paginated_users]
                 
-                return {
+                return ORJSONResponse({
                     "users": formatted_users,
                     "pagination": {
-                        "total": len(users),
+                        "total": total_users,
                         "limit": limit,
                         "offset": offset,
-                        "has_more": offset + limit < len(users)
+                        "has_more": offset + limit < total_users
                     }
-                }
+                })
                 
             except Exception as e:
                 logger.error(f"Ошибка получения пользователей: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
         
-        @self.app.get("/api/queue")
-        async def get_queue_info():
+        @app.get("/api/queue")
+        async def get_queue_info(request: Request):
             """Возвращает информацию об очереди обработки"""
             try:
-                from core.processing_queue import processing_queue
-                return processing_queue.get_queue_stats()
+                return json_response(request, orjson.dumps(processing_queue.get_queue_stats()))
             except Exception as e:
                 logger.error(f"Ошибка получения информации об очереди: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
         
-        @self.app.get("/api/cache")
-        async def get_cache_info():
+        @app.get("/api/cache")
+        async def get_cache_info(request: Request):
             """Возвращает информацию о кэше"""
             try:
-                from core.cache_manager import cache_manager
-                return cache_manager.get_cache_stats()
+                return json_response(request, orjson.dumps(cache_manager.get_cache_stats()))
             except Exception as e:
                 logger.error(f"Ошибка получения информации о кэше: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
         
-        @self.app.delete("/api/cache")
+        @app.delete("/api/cache")
         async def clear_cache():
             """Очищает весь кэш"""
             try:
-                from core.cache_manager import cache_manager
                 deleted_count = cache_manager.clear_all_cache()
                 return {"message": f"Cache cleared", "deleted_files": deleted_count}
             except Exception as e:
                 logger.error(f"Ошибка очистки кэша: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
         
-        @self.app.get("/api/backups")
+        @app.get("/api/backups")
         async def get_backups():
             """Возвращает информацию о бэкапах"""
             try:
-                from services.backup_service import backup_service
                 return backup_service.get_backup_info()
             except Exception as e:
                 logger.error(f"Ошибка получения информации о бэкапах: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
         
-        @self.app.post("/api/backups/create")
+        @app.post("/api/backups/create")
         async def create_backup(comment: str = None):
             """Создает резервную копию"""
             try:
-                from services.backup_service import backup_service
-                backup_path = backup_service.create_backup(comment)
+                backup_path = await run_in_threadpool(backup_service.create_backup, comment)
                 if backup_path:
                     return {
                         "message": "Backup created successfully",
@@ -246,71 +390,101 @@ class AdminAPI:
                 logger.error(f"Ошибка создания бэкапа: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
         
-        @self.app.get("/api/logs")
-        async def get_logs(lines: int = Query(100, ge=1, le=10000)):
+        @app.get("/api/logs")
+        async def get_logs(
+            lines: int = Query(100, ge=1, le=10000),
+            include_total: bool = False,
+            format: Literal["json", "text", "ndjson"] = Query("json")
+        ):
             """Возвращает последние строки логов"""
             try:
-                log_file = f'bot_log_{datetime.now().strftime("%Y%m%d")}.log'
-                if not os.path.exists(log_file):
-                    return {"logs": [], "file": log_file, "exists": False}
+                log_file = _today_log_name()
+                if format != "json":
+                    # Потоковая отдача: память не зависит от числа строк
+                    media_type = "application/x-ndjson" if format == "ndjson" else "text/plain"
+                    if not os.path.exists(log_file):
+                        return Response(media_type=media_type)
+                    return StreamingResponse(
+                        _iter_log_tail(log_file, lines, as_ndjson=format == "ndjson"),
+                        media_type=media_type
+                    )
                 
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    all_lines = f.readlines()
+                if not os.path.exists(log_file):
+                    return ORJSONResponse({"logs": [], "file": log_file, "exists": False})
                 
-                last_lines = all_lines[-lines:] if len(all_lines) > lines else all_lines
+                # Читаем только хвост файла; полный подсчет строк - по запросу
+                last_lines, total_lines = await run_in_threadpool(_read_log_tail, log_file, lines, include_total)
                 
-                return {
+                return ORJSONResponse({
                     "logs": last_lines,
                     "file": log_file,
-                    "total_lines": len(all_lines),
+                    "total_lines": total_lines,
                     "returned_lines": len(last_lines),
                     "exists": True
-                }
+                })
             except Exception as e:
                 logger.error(f"Ошибка чтения логов: {e}")
                 raise HTTPException(status_code=500, detail=str(e))
     
     def start(self):
-        """Запускает веб-сервер в отдельном процессе"""
-        if self.is_running:
-            logger.warning("Веб-сервер уже запущен")
-            return
+        """Запускает веб-сервер в отдельном потоке"""
+        with self._start_lock:
+            # Состояние берем у потока и сервера: is_running выставляет и сбрасывает serve(),
+            # а serve() может работать и задачей в event loop бота, без потока
+            if (self.thread is not None and self.thread.is_alive()) or self.server is not None:
+                logger.warning("Веб-сервер уже запущен")
+                return
+            
+            if self.app is None:
+                logger.warning("Admin API отключен - приложение не собрано")
+                return
+            
+            def run_server():
+                try:
+                    asyncio.run(self.serve())
+                except (Exception, SystemExit) as e:
+                    # uvicorn завершает работу через sys.exit, например если порт занят
+                    logger.error(f"❌ Ошибка веб-сервера: {e!r}")
+            
+            self.thread = threading.Thread(target=run_server, daemon=True)
+            self.thread.start()
         
-        if not self._setup_fastapi():
-            logger.warning("Admin API отключен - FastAPI не доступен")
-            return
+        logger.info(f"🌐 Веб-панель администратора запущена: http://{self.host}:{self.port}")
+        logger.info(f"📚 Документация API: http://{self.host}:{self.port}/docs")
+    
+    async def serve(self):
+        """Обслуживает запросы в текущем event loop до вызова stop()"""
+        import uvicorn
         
-        def run_server():
-            try:
-                import uvicorn
-                # Создаем новое event loop для этого потока
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                config = uvicorn.Config(
-                    self.app, 
-                    host=self.host, 
-                    port=self.port,
-                    log_level="info",
-                    access_log=True,
-                    loop="asyncio"
-                )
-                server = uvicorn.Server(config)
-                loop.run_until_complete(server.serve())
-                
-            except Exception as e:
-                logger.error(f"❌ Ошибка веб-сервера: {e}")
-                self.is_running = False
+        if self.app is None:
+            logger.warning("Admin API отключен - приложение не собрано")
+            return
         
-        self.thread = threading.Thread(target=run_server, daemon=True)
-        self.thread.start()
+        config = uvicorn.Config(
+            self.app, 
+            host=self.host, 
+            port=self.port,
+            log_level="info",
+            access_log=True,
+            loop="asyncio"
+        )
+        self.server = uvicorn.Server(config)
+        # Блокировка привязывается к event loop, поэтому создается в том, где работает сервер
+        self._stats_lock = asyncio.Lock()
         self.is_running = True
-        
-        logger.info(f"🌐 Веб-панель администратора запущена: http://{self.host}:{self.port}")
-        logger.info(f"📚 Документация API: http://{self.host}:{self.port}/docs")
+        try:
+            await self.server.serve()
+        finally:
+            self.server = None
+            self.is_running = False
     
     def stop(self):
         """Останавливает веб-сервер"""
+        if self.server is not None:
+            self.server.should_exit = True
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+        self.thread = None
         self.is_running = False
         logger.info("🌐 Веб-панель администратора остановлена")
     